@@ -1,21 +1,140 @@
+import io
 import subprocess
 import json
 import re
-from typing import List, Dict
+import threading
+import time
+from typing import Iterator, List, Dict, Tuple
 
-# Windows-only RSSI retrieval via netsh. No external dependencies.
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+# Windows-only RSSI retrieval via netsh. No required external dependencies;
+# the optional hyperscan package speeds up parsing when installed.
 # Parses: SSID, BSSID (MAC), Signal (RSSI), Channel, Frequency band, Security/Authentication, and estimates WiFi standard.
 
 NETSH_CMD = [
     "netsh", "wlan", "show", "networks", "mode=bssid"
 ]
+# Don't flash a console window for netsh on Windows (0 elsewhere).
+NETSH_FLAGS = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+MAC_RE = re.compile(r"[0-9A-Fa-f:]{17}")
+
+# Field ids reported by the line scanners below.
+F_SSID, F_BSSID, F_SIGNAL, F_CHANNEL, F_AUTH, F_ENCR = range(6)
+
+# Lowercased line key (without the "1", "2"... index) -> field id.
+FIELD_KEYS = {
+    "ssid": F_SSID,
+    "bssid": F_BSSID,
+    "signal": F_SIGNAL,
+    "channel": F_CHANNEL,
+    "authentication": F_AUTH,
+    "encryption": F_ENCR,
+}
+
+# Line patterns for a single Hyperscan pass over the whole output. Lines are
+# matched with [ \t] rather than \s so a match never spans a newline.
+HS_PATTERNS = (
+    (F_SSID, rb"^[ \t]*SSID[ \t]+\d+[ \t]*:[^\n]*$", True),
+    (F_BSSID, rb"^[ \t]*BSSID[ \t]+\d+[ \t]*:[ \t]*[0-9A-Fa-f:]{17}[ \t\r]*$", False),
+    (F_SIGNAL, rb"^[ \t]*Signal[ \t]*:[ \t]*\d+%[ \t\r]*$", True),
+    (F_CHANNEL, rb"^[ \t]*Channel[ \t]*:[ \t]*\d+[ \t\r]*$", True),
+    (F_AUTH, rb"^[ \t]*Authentication[ \t]*:[^\n]*$", True),
+    (F_ENCR, rb"^[ \t]*Encryption[ \t]*:[^\n]*$", True),
+)
+
+
+def _compile_hs_db():
+    if hyperscan is None:
+        return None
+    base = hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_SOM_LEFTMOST
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[p for _, p, _ in HS_PATTERNS],
+        ids=[fid for fid, _, _ in HS_PATTERNS],
+        elements=len(HS_PATTERNS),
+        flags=[base | (hyperscan.HS_FLAG_CASELESS if ci else 0) for _, _, ci in HS_PATTERNS],
+    )
+    return db
+
+
+HS_DB = _compile_hs_db()
+
+# Hyperscan scratch space can't be shared by concurrent scans, and the
+# servers are threaded, so each thread gets its own.
+_hs_local = threading.local()
+
+
+def _hs_scratch():
+    scratch = getattr(_hs_local, "scratch", None)
+    if scratch is None:
+        scratch = _hs_local.scratch = hyperscan.Scratch(HS_DB)
+    return scratch
 
-SSID_RE = re.compile(r"^\s*SSID\s+\d+\s*:\s*(.*)\s*$", re.I)
-BSSID_RE = re.compile(r"^\s*BSSID\s+\d+\s*:\s*([0-9A-Fa-f:]{17})\s*$")
-SIG_RE = re.compile(r"^\s*Signal\s*:\s*(\d+)%\s*$", re.I)
-CHAN_RE = re.compile(r"^\s*Channel\s*:\s*(\d+)\s*$", re.I)
-AUTH_RE = re.compile(r"^\s*Authentication\s*:\s*(.*)\s*$", re.I)
-ENCR_RE = re.compile(r"^\s*Encryption\s*:\s*(.*)\s*$", re.I)
+# netsh takes hundreds of ms per scan, so parsed results are reused for a
+# few seconds across API calls.
+SCAN_CACHE_TTL = 3.0
+_scan_cache = {"t": float("-inf"), "v": []}
+
+
+# Windows quality often maps roughly as: RSSI ≈ (quality/2) − 100.
+PERCENT_TO_RSSI = tuple(int((p / 2) - 100) for p in range(101))
+
+# channel -> (band, estimated standard). Heuristic:
+# 2.4 GHz channels → 802.11n (WiFi 4) or 802.11ax (WiFi 6)
+# 5 GHz channels (very rough grouping) → 802.11ac (WiFi 5) or 802.11ax (WiFi 6)
+CHANNEL_INFO = {ch: ("2.4 GHz", "WiFi 4/6") for ch in range(1, 15)}
+CHANNEL_INFO.update({ch: ("5 GHz", "WiFi 5/6") for ch in range(32, 197)})
+UNKNOWN_CHANNEL = ("Unknown", "Unknown")
+
+# Keys of the dicts fetch_wifi_networks returns, in order, with JSON types.
+NETWORK_SCHEMA = (
+    ("ssid", str),
+    ("bssid", str),
+    ("signal_percent", int),
+    ("rssi", int),
+    ("channel", int),
+    ("band", str),
+    ("auth", str),
+    ("encryption", str),
+    ("wifi_standard", str),
+)
+
+
+def _build_network_encoder():
+    # Generate one %-template function for the fixed schema instead of going
+    # through json's per-value type dispatch. Strings use the C-accelerated
+    # ASCII escaper, so output matches json.dumps' default ensure_ascii.
+    fmt = "{" + ",".join(
+        '"%s":%s' % (key, "%d" if typ is int else "%s") for key, typ in NETWORK_SCHEMA
+    ) + "}"
+    args = ", ".join(
+        ("n[%r]" if typ is int else "_s(n[%r])") % key for key, typ in NETWORK_SCHEMA
+    )
+    src = "def encode_network(n, _s=_s, _fmt=_fmt):\n    return _fmt % (" + args + ")\n"
+    ns = {"_s": json.encoder.encode_basestring_ascii, "_fmt": fmt}
+    exec(src, ns)
+    return ns["encode_network"]
+
+
+encode_network = _build_network_encoder()
+
+
+def encode_networks_payload(networks: List[Dict]) -> bytes | None:
+    """
+    Encode {"networks": networks} with the generated encoder. Returns None if
+    a network doesn't fit NETWORK_SCHEMA (e.g. a None channel) so callers can
+    fall back to a generic encoder.
+    """
+    try:
+        body = ",".join(map(encode_network, networks))
+    except (TypeError, KeyError):
+        return None
+    return ('{"networks":[' + body + "]}").encode("ascii")
 
 
 def percent_to_rssi(percent: int) -> int:
@@ -25,60 +144,121 @@ def percent_to_rssi(percent: int) -> int:
     This yields -100 dBm at 0% and -50 dBm at 100%, which aligns better
     with typical adapter reporting.
     """
-    percent = max(0, min(100, int(percent)))
-    return int((percent / 2) - 100)
+    p = int(percent)
+    return PERCENT_TO_RSSI[0 if p < 0 else 100 if p > 100 else p]
 
 
 def channel_to_band(channel: int) -> str:
-    if 1 <= channel <= 14:
-        return "2.4 GHz"
-    # Very rough grouping for 5 GHz common channels
-    return "5 GHz" if 32 <= channel <= 196 else "Unknown"
+    return CHANNEL_INFO.get(channel, UNKNOWN_CHANNEL)[0]
 
 
 def estimate_wifi_standard(channel: int, bandwidth_mhz: int | None = None) -> str:
-    # Heuristic: 2.4 GHz channels → 802.11n (WiFi 4) or 802.11ax (WiFi 6)
-    # 5 GHz channels → 802.11ac (WiFi 5) or 802.11ax (WiFi 6)
-    if 1 <= channel <= 14:
-        return "WiFi 4/6"
-    if 32 <= channel <= 196:
-        return "WiFi 5/6"
-    return "Unknown"
+    return CHANNEL_INFO.get(channel, UNKNOWN_CHANNEL)[1]
+
+
+def _field_value(field: int, text: str):
+    if field in (F_SIGNAL, F_CHANNEL):
+        return int(text.strip().rstrip("%"))
+    return text.strip()
+
+
+def _scan_fields_prefix(raw: bytes) -> Iterator[Tuple[int, object]]:
+    # One partition + dict lookup per line; only matched fields do more work.
+    # Lines are read lazily rather than materialized with splitlines(), and
+    # the trailing newline is dropped by the strip() on the matched value.
+    for line in io.StringIO(raw.decode("utf-8", "ignore")):
+        key, sep, val = line.partition(":")
+        if not sep:
+            continue
+        name, _, idx = key.strip().partition(" ")
+        field = FIELD_KEYS.get(name.lower())
+        if field is None:
+            continue
+        idx = idx.strip()
+        if field == F_SSID or field == F_BSSID:
+            if not idx.isdecimal():
+                continue
+        elif idx:
+            continue
+        val = val.strip()
+        if field == F_BSSID:
+            if not MAC_RE.fullmatch(val):
+                continue
+        elif field == F_SIGNAL:
+            if not (val.endswith("%") and val[:-1].isdecimal()):
+                continue
+            val = int(val[:-1])
+        elif field == F_CHANNEL:
+            if not val.isdecimal():
+                continue
+            val = int(val)
+        yield field, val
+
 
+def _scan_fields_hs(buf: bytes) -> Iterator[Tuple[int, object]]:
+    hits: List[Tuple[int, int, int]] = []
+
+    def on_match(field, start, end, flags, context):
+        hits.append((start, field, end))
 
-def fetch_wifi_networks() -> List[Dict]:
-    """Run netsh and parse networks to a structured list."""
     try:
-        output = subprocess.check_output(NETSH_CMD, shell=False, text=True, encoding="utf-8", errors="ignore")
+        HS_DB.scan(buf, match_event_handler=on_match, scratch=_hs_scratch())
+    except hyperscan.HyperscanError:
+        yield from _scan_fields_prefix(buf)
+        return
+    hits.sort()
+    for start, field, end in hits:
+        line = buf[start:end].decode("utf-8", "ignore")
+        yield field, _field_value(field, line.split(":", 1)[1])
+
+
+def scan_fields(raw: bytes) -> Iterator[Tuple[int, object]]:
+    """Yield (field id, value) pairs for the netsh lines we care about, in order."""
+    if HS_DB is not None:
+        return _scan_fields_hs(raw)
+    return _scan_fields_prefix(raw)
+
+
+def fetch_wifi_networks(force: bool = False) -> List[Dict]:
+    """Run netsh and parse networks to a structured list.
+
+    Results are cached for SCAN_CACHE_TTL seconds; pass force=True to rescan.
+    """
+    if not force and time.monotonic() - _scan_cache["t"] < SCAN_CACHE_TTL:
+        return _scan_cache["v"]
+    try:
+        raw = subprocess.run(
+            NETSH_CMD,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+            creationflags=NETSH_FLAGS,
+        ).stdout
     except Exception as e:
         return []
 
-    networks: List[Dict] = []
+    # Keyed by BSSID so duplicates collapse while parsing. An entry is only
+    # (re)inserted once its Signal line is seen, so incomplete entries never
+    # land and the last complete sighting of a BSSID wins.
+    networks: Dict[str, Dict] = {}
+    current = None
     current_ssid = None
     current_auth = None
     current_encr = None
 
-    for line in output.splitlines():
-        m = SSID_RE.match(line)
-        if m:
-            current_ssid = m.group(1).strip()
+    for field, value in scan_fields(raw):
+        if field == F_SSID:
+            current_ssid = value
             current_auth = None
             current_encr = None
-            continue
-        m = AUTH_RE.match(line)
-        if m:
-            current_auth = m.group(1).strip()
-            continue
-        m = ENCR_RE.match(line)
-        if m:
-            current_encr = m.group(1).strip()
-            continue
-        m = BSSID_RE.match(line)
-        if m and current_ssid:
-            bssid = m.group(1).lower()
-            networks.append({
+        elif field == F_AUTH:
+            current_auth = value
+        elif field == F_ENCR:
+            current_encr = value
+        elif field == F_BSSID and current_ssid:
+            current = {
                 "ssid": current_ssid,
-                "bssid": bssid,
+                "bssid": value.lower(),
                 "signal_percent": None,
                 "rssi": None,
                 "channel": None,
@@ -86,28 +266,21 @@ def fetch_wifi_networks() -> List[Dict]:
                 "auth": current_auth,
                 "encryption": current_encr,
                 "wifi_standard": None,
-            })
-            continue
-        m = SIG_RE.match(line)
-        if m and networks:
-            p = int(m.group(1))
-            networks[-1]["signal_percent"] = p
-            networks[-1]["rssi"] = percent_to_rssi(p)
-            continue
-        m = CHAN_RE.match(line)
-        if m and networks:
-            ch = int(m.group(1))
-            networks[-1]["channel"] = ch
-            networks[-1]["band"] = channel_to_band(ch)
-            networks[-1]["wifi_standard"] = estimate_wifi_standard(ch)
-            continue
+            }
+        elif field == F_SIGNAL and current is not None:
+            current["signal_percent"] = value
+            current["rssi"] = percent_to_rssi(value)
+            networks[current["bssid"]] = current
+        elif field == F_CHANNEL and current is not None:
+            band, standard = CHANNEL_INFO.get(value, UNKNOWN_CHANNEL)
+            current["channel"] = value
+            current["band"] = band
+            current["wifi_standard"] = standard
 
-    # Deduplicate BSSIDs and filter incomplete
-    dedup = {}
-    for n in networks:
-        if n.get("bssid") and n.get("rssi") is not None:
-            dedup[n["bssid"]] = n
-    return list(dedup.values())
+    result = list(networks.values())
+    _scan_cache["t"] = time.monotonic()
+    _scan_cache["v"] = result
+    return result
 
 
 def main():
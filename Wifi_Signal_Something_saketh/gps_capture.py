@@ -1,7 +1,19 @@
 import json
 import os
 import random
-from typing import Dict, Any, Tuple
+import threading
+import time
+from typing import Dict, Any, List, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 GPS_ORIGINAL = os.path.join(DATA_DIR, 'gps_original.json')
@@ -10,26 +22,80 @@ GPS_COPY2 = os.path.join(DATA_DIR, 'gps_copy2.json')
 WIFI_ORIGINAL = os.path.join(DATA_DIR, 'wifi_original.json')
 WIFI_COPY1 = os.path.join(DATA_DIR, 'wifi_copy1.json')
 WIFI_COPY2 = os.path.join(DATA_DIR, 'wifi_copy2.json')
+DATA_FILES = {
+    "gps_original": GPS_ORIGINAL,
+    "gps_copy1": GPS_COPY1,
+    "gps_copy2": GPS_COPY2,
+    "wifi_original": WIFI_ORIGINAL,
+    "wifi_copy1": WIFI_COPY1,
+    "wifi_copy2": WIFI_COPY2,
+}
+
+# On Windows os.replace fails with PermissionError while another thread has
+# the target open for reading; retry briefly before giving up.
+REPLACE_RETRIES = 5
+REPLACE_RETRY_DELAY = 0.01
+
+_rng = np.random.default_rng() if np is not None else None
 
 
 def ensure_data_dir():
     os.makedirs(DATA_DIR, exist_ok=True)
 
 
+ensure_data_dir()
+
+
 def save_json(path: str, data: Any):
     ensure_data_dir()
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(data, indent=2).encode('utf-8')
+    # Write-once-then-rename so concurrent readers never see a torn file.
+    # The temp name is unique per thread, and os.open applies the umask so
+    # the replaced file keeps the usual permissions.
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        for attempt in range(REPLACE_RETRIES):
+            try:
+                os.replace(tmp, path)
+                break
+            except PermissionError:
+                if attempt == REPLACE_RETRIES - 1:
+                    raise
+                time.sleep(REPLACE_RETRY_DELAY * (attempt + 1))
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
 
 
 def load_json(path: str) -> Any:
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        return orjson.loads(raw) if orjson is not None else json.loads(raw)
     except Exception:
         return None
 
 
+def load_json_bytes(path: str) -> bytes:
+    # Raw JSON document for splicing into a response, or b'null' if missing.
+    # Files are only ever written whole by save_json, so no parse is needed.
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+    except OSError:
+        return b'null'
+    return raw if raw.strip() else b'null'
+
+
 def meters_to_deg_offsets(meters: float, lat: float) -> Tuple[float, float]:
     # Approximate conversion near given latitude
     dlat = meters / 111_320.0
@@ -69,23 +135,41 @@ def save_original_wifi(wifi_data: Dict[str, Any]) -> Dict[str, Any]:
     return tagged
 
 
+def jitter_field(networks: List[Dict[str, Any]], key: str, spread: int, lo: int, hi: int):
+    # Add a random integer in [-spread, spread] to networks[i][key] where set,
+    # clamp to [lo, hi] and store as int. Done in one NumPy pass if available.
+    idx = [i for i, n in enumerate(networks) if n.get(key) is not None]
+    if not idx:
+        return
+    if np is not None:
+        vals = np.fromiter((networks[i][key] for i in idx), dtype=np.float64, count=len(idx))
+        vals += _rng.integers(-spread, spread + 1, size=len(idx))
+        vals = np.clip(vals, lo, hi).astype(np.int64)
+        for i, v in zip(idx, vals.tolist()):
+            networks[i][key] = v
+        return
+    for i in idx:
+        n = networks[i]
+        n[key] = int(max(lo, min(hi, n[key] + random.randint(-spread, spread))))
+
+
 def fabricate_wifi_copy(wifi_data: Dict[str, Any]) -> Dict[str, Any]:
-    # Apply small realistic variations to RSSI and signal_percent
-    import copy
-    new_data = copy.deepcopy(wifi_data)
+    # Apply small realistic variations to RSSI and signal_percent.
+    # wifi_data is a flat dict plus a list of flat network dicts, so a
+    # two-level shallow clone is enough (and much cheaper than deepcopy).
+    new_data = {k: v for k, v in wifi_data.items() if k != "networks"}
+    new_data["networks"] = [dict(n) for n in wifi_data.get("networks", [])]
     new_data["label"] = "Copy"
-    for n in new_data.get("networks", []):
+    networks = new_data["networks"]
+    if networks:
         # random RSSI fluctuation within ±5 dBm, bounded
-        if n.get("rssi") is not None:
-            dr = random.randint(-5, 5)
-            n["rssi"] = int(max(-95, min(-25, n["rssi"] + dr)))
-        if n.get("signal_percent") is not None:
-            dp = random.randint(-8, 8)
-            n["signal_percent"] = int(max(1, min(100, n["signal_percent"] + dp)))
+        jitter_field(networks, "rssi", 5, -95, -25)
+        jitter_field(networks, "signal_percent", 8, 1, 100)
     return new_data
 
 
 def generate_wifi_copies(wifi_data: Dict[str, Any]) -> Dict[str, Any]:
+    # Both copies are built in memory first, then each is written in one go.
     copy1 = fabricate_wifi_copy(wifi_data)
     copy1["label"] = "Copy1"
     copy2 = fabricate_wifi_copy(wifi_data)
@@ -96,12 +180,5 @@ def generate_wifi_copies(wifi_data: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def list_data_files() -> Dict[str, str]:
-    ensure_data_dir()
-    return {
-        "gps_original": GPS_ORIGINAL,
-        "gps_copy1": GPS_COPY1,
-        "gps_copy2": GPS_COPY2,
-        "wifi_original": WIFI_ORIGINAL,
-        "wifi_copy1": WIFI_COPY1,
-        "wifi_copy2": WIFI_COPY2,
-    }
+    # Shared constant; callers must not mutate it.
+    return DATA_FILES
@@ -1,29 +1,78 @@
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+import gzip
 import json
 import os
+import stat
+import threading
 import urllib.parse
-from io import BytesIO
+from io import BytesIO, UnsupportedOperation
 from typing import Tuple
 
-from rssi_windows import fetch_wifi_networks
-from gps_capture import save_original_gps, generate_gps_copies, save_original_wifi, generate_wifi_copies, list_data_files, ensure_data_dir
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from rssi_windows import fetch_wifi_networks, encode_networks_payload
+from gps_capture import save_original_gps, generate_gps_copies, save_original_wifi, generate_wifi_copies, list_data_files, ensure_data_dir, load_json_bytes
 from wifi_graph import prepare_distance_strength
 
 ROOT_DIR = os.path.dirname(__file__)
 WEB_DIR = os.path.join(ROOT_DIR, 'web')
 DATA_DIR = os.path.join(ROOT_DIR, 'data')
 
+# Requests are handled on separate threads; this keeps the first-snapshot
+# check-and-write in /api/wifi from running twice.
+_snapshot_lock = threading.Lock()
+
+# JSON responses at least this large are compressed if the client allows it.
+COMPRESS_MIN_BYTES = 1024
+
+# Without orjson, scans at least this long go through the schema-specific
+# encoder in rssi_windows rather than json.dumps.
+FAST_ENCODE_MIN_NETWORKS = 8
+
+
+def encode_json(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode('utf-8')
+
 
 def respond_json(handler: SimpleHTTPRequestHandler, status: int, data):
-    payload = json.dumps(data).encode('utf-8')
+    respond_bytes(handler, status, encode_json(data))
+
+
+def respond_bytes(handler: SimpleHTTPRequestHandler, status: int, payload: bytes):
+    encoding = None
+    if len(payload) >= COMPRESS_MIN_BYTES:
+        accept = handler.headers.get('Accept-Encoding', '')
+        if zstandard is not None and 'zstd' in accept:
+            payload = zstandard.ZstdCompressor(level=3).compress(payload)
+            encoding = 'zstd'
+        elif 'gzip' in accept:
+            payload = gzip.compress(payload, 1)
+            encoding = 'gzip'
     handler.send_response(status)
     handler.send_header('Content-Type', 'application/json; charset=utf-8')
     handler.send_header('Content-Length', str(len(payload)))
     handler.send_header('Cache-Control', 'no-store')
+    if encoding:
+        handler.send_header('Content-Encoding', encoding)
+        handler.send_header('Vary', 'Accept-Encoding')
     handler.end_headers()
     handler.wfile.write(payload)
 
 
+# The data file paths never change, so /api/files is encoded once.
+FILES_JSON = encode_json(list_data_files())
+
+
 class AppHandler(SimpleHTTPRequestHandler):
     def translate_path(self, path: str) -> str:
         # Serve files from web directory by default
@@ -34,15 +83,55 @@ class AppHandler(SimpleHTTPRequestHandler):
         full = os.path.join(WEB_DIR, *rel.split('/'))
         return full
 
+    def send_head(self):
+        # ETag / If-None-Match on top of the stock Last-Modified handling
+        self._etag = None
+        path = self.translate_path(self.path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            return super().send_head()
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match and (if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return None
+        self._etag = etag
+        return super().send_head()
+
+    def end_headers(self):
+        etag = getattr(self, '_etag', None)
+        if etag:
+            self._etag = None
+            self.send_header('ETag', etag)
+        super().end_headers()
+
+    def copyfile(self, source, outputfile):
+        # Static files go through socket.sendfile (kernel zero-copy where available)
+        try:
+            source.fileno()
+        except (AttributeError, OSError, UnsupportedOperation):
+            return super().copyfile(source, outputfile)
+        self.connection.sendfile(source)
+
     def do_GET(self):
         if self.path.startswith('/api/wifi'):
             networks = fetch_wifi_networks()
             # Persist the "original" snapshot if not present yet
-            ensure_data_dir()
-            if not os.path.exists(os.path.join(DATA_DIR, 'wifi_original.json')):
-                save_original_wifi({"networks": networks})
-                generate_wifi_copies({"networks": networks})
-            respond_json(self, 200, {"networks": networks})
+            with _snapshot_lock:
+                if not os.path.exists(os.path.join(DATA_DIR, 'wifi_original.json')):
+                    save_original_wifi({"networks": networks})
+                    generate_wifi_copies({"networks": networks})
+            payload = None
+            if orjson is None and len(networks) >= FAST_ENCODE_MIN_NETWORKS:
+                payload = encode_networks_payload(networks)
+            if payload is None:
+                payload = encode_json({"networks": networks})
+            respond_bytes(self, 200, payload)
             return
         if self.path.startswith('/api/distance_strength'):
             networks = fetch_wifi_networks()
@@ -50,19 +139,17 @@ class AppHandler(SimpleHTTPRequestHandler):
             respond_json(self, 200, {"points": points})
             return
         if self.path.startswith('/api/files'):
-            respond_json(self, 200, list_data_files())
+            respond_bytes(self, 200, FILES_JSON)
             return
         if self.path.startswith('/api/data'):
             # Return combined originals and copies for both GPS and WiFi
-            files = list_data_files()
-            combo = {}
-            for key, path in files.items():
-                try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        combo[key] = json.load(f)
-                except Exception:
-                    combo[key] = None
-            respond_json(self, 200, combo)
+            # Splice the stored documents together as-is rather than parsing
+            # each file and re-encoding the combination.
+            body = b','.join(
+                b'"%s":%s' % (key.encode(), load_json_bytes(path))
+                for key, path in list_data_files().items()
+            )
+            respond_bytes(self, 200, b'{' + body + b'}')
             return
         # default static
         return super().do_GET()
@@ -85,7 +172,7 @@ class AppHandler(SimpleHTTPRequestHandler):
             return
         if self.path.startswith('/api/generate_copies'):
             # Regenerate wifi copies based on latest scan
-            networks = fetch_wifi_networks()
+            networks = fetch_wifi_networks(force=True)
             ensure_data_dir()
             saved = save_original_wifi({"networks": networks})
             copies = generate_wifi_copies({"networks": networks})
@@ -98,7 +185,7 @@ class AppHandler(SimpleHTTPRequestHandler):
 if __name__ == '__main__':
     os.chdir(WEB_DIR)
     port = int(os.environ.get('PORT', '8000'))
-    httpd = HTTPServer(('127.0.0.1', port), AppHandler)
+    httpd = ThreadingHTTPServer(('127.0.0.1', port), AppHandler)
     print(f"Serving on http://127.0.0.1:{port}")
     print("Open this URL in a modern browser.")
     httpd.serve_forever()
\ No newline at end of file
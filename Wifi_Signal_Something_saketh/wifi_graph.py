@@ -8,6 +8,31 @@ This is a rough estimate and depends on environment and band.
 from __future__ import annotations
 from typing import List, Dict, Any
 
+# band -> (P0, n); see rssi_to_distance
+BAND_MODELS = {
+    '5 GHz': (-47.0, 2.7),
+    '2.4 GHz': (-40.0, 2.2),
+}
+# Fallback if band unknown
+DEFAULT_MODEL = (-43.0, 2.4)
+
+
+def _model_distance(rssi: float, p0: float, n: float) -> float:
+    d = 10 ** ((p0 - rssi) / (10.0 * n))
+    # Clamp to sensible bounds for visualization (typical indoor/outdoor mix)
+    if d < 0.0:
+        d = 0.0
+    if d > 200.0:
+        d = 200.0
+    return d
+
+
+# Precomputed distances for whole-dBm readings, per band (None = unknown band).
+DISTANCE_LUT = {
+    band: {r: _model_distance(r, p0, n) for r in range(-120, 1)}
+    for band, (p0, n) in [*BAND_MODELS.items(), (None, DEFAULT_MODEL)]
+}
+
 
 def rssi_to_distance(rssi: float, band: str | None = None) -> float:
     """Convert RSSI (dBm) to approximate distance (meters).
@@ -28,23 +53,12 @@ def rssi_to_distance(rssi: float, band: str | None = None) -> float:
     except Exception:
         return 0.0
     b = (band or '').strip()
-    if b == '5 GHz':
-        n = 2.7
-        p0 = -47.0
-    elif b == '2.4 GHz':
-        n = 2.2
-        p0 = -40.0
-    else:
-        # Fallback if band unknown
-        n = 2.4
-        p0 = -43.0
-    d = 10 ** ((p0 - rssi) / (10.0 * n))
-    # Clamp to sensible bounds for visualization (typical indoor/outdoor mix)
-    if d < 0.0:
-        d = 0.0
-    if d > 200.0:
-        d = 200.0
-    return d
+    if b not in BAND_MODELS:
+        b = None
+    d = DISTANCE_LUT[b].get(rssi)
+    if d is not None:
+        return d
+    return _model_distance(rssi, *BAND_MODELS.get(b, DEFAULT_MODEL))
 
 
 def prepare_distance_strength(networks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
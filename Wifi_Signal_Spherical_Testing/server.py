@@ -9,23 +9,43 @@ This script runs an HTTP server that:
 This server does NOT perform any WiFi scans itself. It only aggregates
 data sent by wifi_client.py instances.
 """
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+import gzip
 import json
 import os
+import stat
+import threading
 import urllib.parse
-from io import BytesIO
+from io import BytesIO, UnsupportedOperation
 from typing import Tuple
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 # NOTE: We no longer need the local scanning module.
 # from rssi_windows import fetch_wifi_networks 
 
-from gps_capture import save_original_gps, generate_gps_copies, save_original_wifi, generate_wifi_copies, list_data_files, ensure_data_dir
+from gps_capture import save_original_gps, generate_gps_copies, save_original_wifi, generate_wifi_copies, list_data_files, ensure_data_dir, load_json_bytes
 from wifi_graph import prepare_distance_strength
 
 ROOT_DIR = os.path.dirname(__file__)
 WEB_DIR = os.path.join(ROOT_DIR, 'web')
 DATA_DIR = os.path.join(ROOT_DIR, 'data')
 
+# Requests are handled on separate threads; this keeps the first-snapshot
+# check-and-write in /api/wifi from running twice.
+_snapshot_lock = threading.Lock()
+
+# JSON responses at least this large are compressed if the client allows it.
+COMPRESS_MIN_BYTES = 1024
+
 # --- In-memory Storage for Client Data ---
 # This dictionary will store the latest scan results from each client,
 # keyed by their unique laptop_id.
@@ -36,17 +56,65 @@ client_scan_data = {}
 last_received_scan = {"networks": []}
 
 
+def aggregate_client_networks() -> list:
+    """Combine networks from all connected clients into a single list."""
+    all_networks = []
+    for networks in list(client_scan_data.values()):
+        all_networks.extend(networks)
+    return all_networks
+
+
+def encode_json(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode('utf-8')
+
+
 def respond_json(handler: SimpleHTTPRequestHandler, status: int, data):
     """Helper function to send JSON responses."""
-    payload = json.dumps(data).encode('utf-8')
+    respond_bytes(handler, status, encode_json(data))
+
+
+def respond_bytes(handler: SimpleHTTPRequestHandler, status: int, payload: bytes):
+    """Send an already-encoded JSON payload."""
+    encoding = None
+    if len(payload) >= COMPRESS_MIN_BYTES:
+        accept = handler.headers.get('Accept-Encoding', '')
+        if zstandard is not None and 'zstd' in accept:
+            payload = zstandard.ZstdCompressor(level=3).compress(payload)
+            encoding = 'zstd'
+        elif 'gzip' in accept:
+            payload = gzip.compress(payload, 1)
+            encoding = 'gzip'
     handler.send_response(status)
     handler.send_header('Content-Type', 'application/json; charset=utf-8')
     handler.send_header('Content-Length', str(len(payload)))
     handler.send_header('Cache-Control', 'no-store')
+    if encoding:
+        handler.send_header('Content-Encoding', encoding)
+        handler.send_header('Vary', 'Accept-Encoding')
     handler.end_headers()
     handler.wfile.write(payload)
 
 
+# The data file paths never change, so /api/files is encoded once.
+FILES_JSON = encode_json(list_data_files())
+
+# /api/wifi is polled far more often than clients submit, so the combined
+# network list and its encoded payload are rebuilt on submit and reused on
+# every GET. Replaced as one tuple so readers never see a mismatched pair.
+_wifi_lock = threading.Lock()
+wifi_snapshot = ([], encode_json({"networks": []}))
+
+
+def refresh_wifi_snapshot():
+    """Rebuild the combined network list after a client submits a scan."""
+    global wifi_snapshot
+    with _wifi_lock:
+        all_networks = aggregate_client_networks()
+        wifi_snapshot = (all_networks, encode_json({"networks": all_networks}))
+
+
 class AppHandler(SimpleHTTPRequestHandler):
     def translate_path(self, path: str) -> str:
         """Serve files from the 'web' directory."""
@@ -57,48 +125,73 @@ class AppHandler(SimpleHTTPRequestHandler):
         full = os.path.join(WEB_DIR, *rel.split('/'))
         return full
 
+    def send_head(self):
+        """Add ETag / If-None-Match on top of the stock Last-Modified handling."""
+        self._etag = None
+        path = self.translate_path(self.path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            return super().send_head()
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match and (if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return None
+        self._etag = etag
+        return super().send_head()
+
+    def end_headers(self):
+        etag = getattr(self, '_etag', None)
+        if etag:
+            self._etag = None
+            self.send_header('ETag', etag)
+        super().end_headers()
+
+    def copyfile(self, source, outputfile):
+        """Send static files with socket.sendfile (kernel zero-copy where available)."""
+        try:
+            source.fileno()
+        except (AttributeError, OSError, UnsupportedOperation):
+            return super().copyfile(source, outputfile)
+        self.connection.sendfile(source)
+
     def do_GET(self):
         """Handle GET requests for API data and static files."""
         if self.path.startswith('/api/wifi'):
-            # Combine networks from all connected clients into a single list.
-            all_networks = []
-            for networks in client_scan_data.values():
-                all_networks.extend(networks)
-            
+            all_networks, payload = wifi_snapshot
+
             # Persist an "original" snapshot if not present yet, using the first
             # data we receive from a client.
-            ensure_data_dir()
-            if all_networks and not os.path.exists(os.path.join(DATA_DIR, 'wifi_original.json')):
-                save_original_wifi({"networks": all_networks})
-                generate_wifi_copies({"networks": all_networks})
+            with _snapshot_lock:
+                if all_networks and not os.path.exists(os.path.join(DATA_DIR, 'wifi_original.json')):
+                    save_original_wifi({"networks": all_networks})
+                    generate_wifi_copies({"networks": all_networks})
             
-            respond_json(self, 200, {"networks": all_networks})
+            respond_bytes(self, 200, payload)
             return
             
         if self.path.startswith('/api/distance_strength'):
-            # Combine networks from all clients for the graph.
-            all_networks = []
-            for networks in client_scan_data.values():
-                all_networks.extend(networks)
-            
-            points = prepare_distance_strength(all_networks)
+            points = prepare_distance_strength(wifi_snapshot[0])
             respond_json(self, 200, {"points": points})
             return
             
         if self.path.startswith('/api/files'):
-            respond_json(self, 200, list_data_files())
+            respond_bytes(self, 200, FILES_JSON)
             return
             
         if self.path.startswith('/api/data'):
-            files = list_data_files()
-            combo = {}
-            for key, path in files.items():
-                try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        combo[key] = json.load(f)
-                except Exception:
-                    combo[key] = None
-            respond_json(self, 200, combo)
+            # Splice the stored documents together as-is rather than parsing
+            # each file and re-encoding the combination.
+            body = b','.join(
+                b'"%s":%s' % (key.encode(), load_json_bytes(path))
+                for key, path in list_data_files().items()
+            )
+            respond_bytes(self, 200, b'{' + body + b'}')
             return
             
         # Default to serving static files (index.html, etc.)
@@ -111,18 +204,23 @@ class AppHandler(SimpleHTTPRequestHandler):
             raw_body = self.rfile.read(length)
             try:
                 data = json.loads(raw_body.decode('utf-8'))
+                if not isinstance(data, dict):
+                    data = {}
                 laptop_id = data.get('laptop_id')
                 networks = data.get('networks')
 
-                if laptop_id and networks is not None:
+                # Reject bad shapes before storing: everything stored here
+                # is re-aggregated on every later submit.
+                if laptop_id and isinstance(laptop_id, str) and isinstance(networks, list):
                     # Store the received data
                     client_scan_data[laptop_id] = networks
+                    refresh_wifi_snapshot()
                     global last_received_scan
                     last_received_scan = {"networks": networks}
                     print(f"Received scan data from '{laptop_id}' ({len(networks)} networks).")
                     respond_json(self, 200, {"status": "success", "message": "Data received."})
                 else:
-                    respond_json(self, 400, {"error": "Invalid payload; 'laptop_id' and 'networks' are required."})
+                    respond_json(self, 400, {"error": "Invalid payload; 'laptop_id' (string) and 'networks' (list) are required."})
             except (json.JSONDecodeError, UnicodeDecodeError) as e:
                 respond_json(self, 400, {"error": f"Could not parse request body as JSON: {e}"})
             return
@@ -167,7 +265,7 @@ if __name__ == '__main__':
     # '127.0.0.1' would only allow connections from the same machine.
     server_address = ('0.0.0.0', port)
     
-    httpd = HTTPServer(server_address, AppHandler)
+    httpd = ThreadingHTTPServer(server_address, AppHandler)
     print(f"Server is running on http://10.213.9.152:{port}")
     print("Listening for data from WiFi clients...")
     print("Open the URL in a browser to see the visualization.")
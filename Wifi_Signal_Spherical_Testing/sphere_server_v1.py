@@ -6,13 +6,30 @@ WiFi Coverage and Deadzone Visualization Server
 - Aggregates data from multiple static nodes sending JSON scan data.
 """
 
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 import json
 import os
+import threading
 import time
-from typing import Dict, List, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import itertools
 import math
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 ROOT_DIR = os.path.dirname(__file__)
 WEB_DIR = os.path.join(ROOT_DIR, 'web')  # Serve static HTML/JS from here
 DATA_DIR = os.path.join(ROOT_DIR, 'data')
@@ -21,8 +38,23 @@ DATA_DIR = os.path.join(ROOT_DIR, 'data')
 client_scan_data: Dict[str, List[dict]] = {}  # laptop_id -> list of network scans
 client_last_seen: Dict[str, float] = {}
 client_fixed_positions: Dict[str, Tuple[float, float]] = {}  # optional: client-provided
+# Smoothed RSSI per (laptop_id, bssid); see smooth_rssi
+_rssi_ewma: Dict[Tuple[str, str], float] = {}
 
 ACTIVE_TIMEOUT_SEC = 10.0
+# Clients silent for this long are forgotten entirely
+STALE_CLIENT_SEC = 10 * ACTIVE_TIMEOUT_SEC
+
+# Requests run on worker threads. _lock guards the client dicts above and the
+# cache state below. It is only held to mutate them or to copy them (see
+# ClientSnapshot); trilateration and stamping run on the copy, lock-free.
+_lock = threading.Lock()
+
+# Memo for values derived from the client scans (AP positions, encoded
+# responses). Entries are tagged with the scan generation, which every
+# accepted submit bumps, and expire when an active client would time out.
+_scan_gen = 0
+_cache: Dict[str, Tuple[int, float, object]] = {}  # name -> (gen, valid_until, value)
 
 # Grid configuration
 GRID_WIDTH = 30.0  # meters
@@ -38,6 +70,10 @@ TX_POWER = -30.0
 PATH_LOSS_EXP = 2.2
 
 DEADZONE_THRESHOLD = -80  # RSSI below this is considered weak coverage
+HEATMAP_SCALE = 255  # coverage heatmap is sent as uint8, 255 == full strength
+
+# Weight of a new RSSI sample in the per-(client, BSSID) moving average
+RSSI_EWMA_ALPHA = 0.3
 
 
 def rssi_to_distance(rssi_dbm: float, tx_power: float = TX_POWER, n: float = PATH_LOSS_EXP) -> float:
@@ -49,9 +85,97 @@ def rssi_to_distance(rssi_dbm: float, tx_power: float = TX_POWER, n: float = PAT
         return GRID_WIDTH  # fallback large value
 
 
-def active_clients() -> List[str]:
+def note_scan_submitted():
+    """Invalidate everything derived from the client scans. Call with _lock held."""
+    global _scan_gen
+    _scan_gen += 1
+    _cache.clear()
+
+
+def smooth_rssi(laptop_id: str, networks: List[dict]):
+    """
+    Replace each network's RSSI with an exponentially weighted moving average
+    over this client's previous scans, so single noisy samples don't move the
+    trilaterated AP positions around. Call with _lock held.
+    """
+    for n in networks:
+        if not isinstance(n, dict):
+            continue
+        bssid = n.get("bssid")
+        rssi = n.get("rssi")
+        if not bssid or not isinstance(rssi, (int, float)):
+            continue
+        key = (laptop_id, bssid)
+        prev = _rssi_ewma.get(key, rssi)
+        new = prev + RSSI_EWMA_ALPHA * (rssi - prev)
+        _rssi_ewma[key] = new
+        n["rssi"] = new
+
+
+def drop_stale_clients(now: float):
+    """Forget clients not heard from in STALE_CLIENT_SEC. Call with _lock held."""
+    stale = {cid for cid, ts in client_last_seen.items() if now - ts > STALE_CLIENT_SEC}
+    if not stale:
+        return
+    for cid in stale:
+        client_scan_data.pop(cid, None)
+        client_last_seen.pop(cid, None)
+        client_fixed_positions.pop(cid, None)
+    for key in [key for key in _rssi_ewma if key[0] in stale]:
+        del _rssi_ewma[key]
+
+
+class ClientSnapshot(NamedTuple):
+    """Copy of the client state taken under _lock; builders work on this, lock-free."""
+    gen: int  # _scan_gen the copy was taken at
+    now: float  # time the copy was taken; activity is judged against this
+    scans: Dict[str, List[dict]]
+    fixed: Dict[str, Tuple[float, float]]
+    seen: Dict[str, float]
+
+
+def _take_snapshot(now: float) -> ClientSnapshot:
+    # Call with _lock held. Submits replace a client's network list rather
+    # than mutating it, so shallow dict copies are enough.
+    return ClientSnapshot(_scan_gen, now, dict(client_scan_data),
+                          dict(client_fixed_positions), dict(client_last_seen))
+
+
+def active_set_valid_until(snap: ClientSnapshot) -> float:
+    """Time until which active_clients(snap) can't change without a new submit."""
+    ends = [ts + ACTIVE_TIMEOUT_SEC for ts in snap.seen.values() if ts + ACTIVE_TIMEOUT_SEC >= snap.now]
+    return min(ends, default=math.inf)
+
+
+def cached(name: str, build, snap: Optional[ClientSnapshot] = None):
+    """
+    Return build(snap) memoized per scan generation. Without snap, a fresh
+    snapshot is taken under the same lock as the lookup; with one (nested
+    memos inside a build), only entries from snap's generation are hits.
+    A value is stored only if no submit has landed since its snapshot.
+    """
     now = time.time()
-    return [cid for cid, ts in client_last_seen.items() if now - ts <= ACTIVE_TIMEOUT_SEC]
+    with _lock:
+        gen = _scan_gen if snap is None else snap.gen
+        hit = _cache.get(name)
+        if hit is not None and hit[0] == gen and now <= hit[1]:
+            return hit[2]
+        if snap is None:
+            snap = _take_snapshot(now)
+    value = build(snap)
+    with _lock:
+        if snap.gen == _scan_gen:
+            _cache[name] = (snap.gen, active_set_valid_until(snap), value)
+    return value
+
+
+def active_clients(snap: ClientSnapshot) -> List[str]:
+    """Clients heard from within ACTIVE_TIMEOUT_SEC, memoized like the responses."""
+    return cached("active_clients", _active_clients, snap)
+
+
+def _active_clients(snap: ClientSnapshot) -> List[str]:
+    return [cid for cid, ts in snap.seen.items() if snap.now - ts <= ACTIVE_TIMEOUT_SEC]
 
 
 def default_anchor_positions(n: int = 3) -> List[Tuple[float, float]]:
@@ -65,15 +189,21 @@ def default_anchor_positions(n: int = 3) -> List[Tuple[float, float]]:
     return out
 
 
-def resolve_client_positions() -> Dict[str, Tuple[float, float]]:
+def resolve_client_positions(snap: ClientSnapshot) -> Dict[str, Tuple[float, float]]:
+    """Positions of up to 3 active clients; only rebuilt after a submit or a client timing out."""
+    return cached("client_positions", _resolve_client_positions, snap)
+
+
+def _resolve_client_positions(snap: ClientSnapshot) -> Dict[str, Tuple[float, float]]:
     # If clients provide positions, use them; else assign deterministic anchors
-    act = sorted(active_clients())
+    act = sorted(active_clients(snap))
+    fixed = snap.fixed
     pos: Dict[str, Tuple[float, float]] = {}
     anchors = default_anchor_positions(3)
     # Prefer provided fixed positions
     for cid in act:
-        if cid in client_fixed_positions:
-            pos[cid] = client_fixed_positions[cid]
+        if cid in fixed:
+            pos[cid] = fixed[cid]
     # Assign remaining up to 3
     for cid in act:
         if cid in pos:
@@ -85,25 +215,43 @@ def resolve_client_positions() -> Dict[str, Tuple[float, float]]:
 
 def trilaterate_xy(points: List[Tuple[float, float, float]]) -> Tuple[float, float] | None:
     """
-    Trilaterate from the first 3 circles using a closed-form 2x2 solve.
+    Trilaterate from all circles with a linear least-squares solve.
+    Subtracting the first circle's equation from the others gives K-1 rows
+    of A [x y]^T = b; with 3 circles this is the exact 2x2 solve.
     points: list of (xi, yi, di)
     returns (x, y) or None on failure.
     """
     try:
         if len(points) < 3:
             return None
-        (x1, y1, d1), (x2, y2, d2), (x3, y3, d3) = points[:3]
-        A = 2*(x2 - x1)
-        B = 2*(y2 - y1)
-        C = d1**2 - d2**2 - x1**2 + x2**2 - y1**2 + y2**2
-        D = 2*(x3 - x1)
-        E = 2*(y3 - y1)
-        F = d1**2 - d3**2 - x1**2 + x3**2 - y1**2 + y3**2
-        denom = A*E - B*D
+        if _trilat3_jit is not None and len(points) == 3:
+            (x1, y1, d1), (x2, y2, d2), (x3, y3, d3) = points
+            ok, x, y = _trilat3_jit(float(x1), float(y1), float(d1), float(x2), float(y2), float(d2),
+                                    float(x3), float(y3), float(d3))
+            return clamp_to_grid(x, y) if ok else None
+        if np is not None:
+            pts = np.asarray(points, dtype=float)
+            x, y, d = pts[:, 0], pts[:, 1], pts[:, 2]
+            A = 2 * np.column_stack((x[1:] - x[0], y[1:] - y[0]))
+            b = d[0]**2 - d[1:]**2 - x[0]**2 + x[1:]**2 - y[0]**2 + y[1:]**2
+            sol, _, rank, _ = np.linalg.lstsq(A, b, rcond=None)
+            if rank < 2:
+                return None
+            return clamp_to_grid(float(sol[0]), float(sol[1]))
+        # Normal equations (A^T A) [x y]^T = A^T b accumulated row by row
+        x1, y1, d1 = points[0]
+        saa = sab = sbb = sac = sbc = 0.0
+        for xi, yi, di in points[1:]:
+            a = 2*(xi - x1)
+            b = 2*(yi - y1)
+            c = d1**2 - di**2 - x1**2 + xi**2 - y1**2 + yi**2
+            saa += a*a ; sab += a*b ; sbb += b*b
+            sac += a*c ; sbc += b*c
+        denom = saa*sbb - sab*sab
         if abs(denom) < 1e-6:
             return None
-        x = (C*E - B*F) / denom
-        y = (A*F - C*D) / denom
+        x = (sac*sbb - sab*sbc) / denom
+        y = (saa*sbc - sab*sac) / denom
         return clamp_to_grid(x, y)
     except Exception:
         return None
@@ -124,15 +272,15 @@ def point_to_cell(x: float, y: float) -> Tuple[int, int]:
     return col, row
 
 
-def compute_ap_positions():
+def compute_ap_positions(snap: ClientSnapshot):
     """
     Returns (aps, meta) where aps is a list of dicts with estimated AP positions:
       {bssid, ssid, band, x, y, distance, bearing_deg, rssi_avg}
     and meta contains client positions and active client ids.
     """
     # Enforce at least 3 active clients
-    act = active_clients()
-    cpos = resolve_client_positions()
+    act = active_clients(snap)
+    cpos = resolve_client_positions(snap)
     meta = {
         "active_clients": act,
         "client_positions": cpos,
@@ -142,23 +290,26 @@ def compute_ap_positions():
     if len(cpos) < 3:
         return aps, meta
 
-    # Build per-BSSID readings across clients (only active & positioned ones)
-    by_bssid: Dict[str, Dict[str, dict]] = {}
-    for cid, nets in client_scan_data.items():
+    # Strongest reading per (bssid, client) across active & positioned clients
+    best: Dict[Tuple[str, str], Tuple[float, dict]] = {}
+    for cid, nets in snap.scans.items():
         if cid not in cpos:
             continue
         for n in nets or []:
             bssid = n.get("bssid")
-            if not bssid:
+            rssi = n.get("rssi")
+            if not bssid or not isinstance(bssid, str) or not isinstance(rssi, (int, float)):
                 continue
-            entry = by_bssid.setdefault(bssid, {})
-            # Keep strongest reading per client if duplicates
-            prev = entry.get(cid)
-            if prev is None or (isinstance(n.get("rssi"), (int, float)) and n.get("rssi", -999) > prev.get("rssi", -999)):
-                entry[cid] = n
+            key = (bssid, cid)
+            prev = best.get(key)
+            if prev is None or rssi > prev[0]:
+                best[key] = (rssi, n)
 
     cx, cy = SERVER_POS["x"], SERVER_POS["y"]
-    for bssid, per_client in by_bssid.items():
+    # Stable sort on bssid only, so each group keeps client order
+    readings = sorted(best.items(), key=lambda kv: kv[0][0])
+    for bssid, group in itertools.groupby(readings, key=lambda kv: kv[0][0]):
+        per_client = list(group)
         # Need at least 3 clients for this BSSID
         if len(per_client) < 3:
             continue
@@ -166,18 +317,13 @@ def compute_ap_positions():
         rssis: List[float] = []
         ssid_val = None
         band_val = None
-        for cid, n in per_client.items():
+        for (_, cid), (rssi, n) in per_client:
             x, y = cpos[cid]
-            rssi = n.get("rssi")
-            if rssi is None:
-                continue
             d = rssi_to_distance(float(rssi))
             pts.append((x, y, d))
             rssis.append(float(rssi))
             ssid_val = ssid_val or n.get("ssid")
             band_val = band_val or n.get("band")
-        if len(pts) < 3:
-            continue
         est = trilaterate_xy(pts)
         if not est:
             continue
@@ -199,43 +345,187 @@ def compute_ap_positions():
     return aps, meta
 
 
-def aggregate_zones() -> Tuple[list, Dict[str, Tuple[int, int]]]:
+def distance_stamp(radius_cells: int):
+    """(2R+1)x(2R+1) float32 falloff 1 - d/R around the center, 0 beyond R."""
+    yy, xx = np.ogrid[-radius_cells:radius_cells + 1, -radius_cells:radius_cells + 1]
+    d = np.hypot(yy, xx)
+    return np.clip(1.0 - d / radius_cells, 0.0, None).astype(np.float32)
+
+
+# Every radius an AP on this grid can get, built once so stamping is a plain add.
+STAMPS = {R: distance_stamp(R) for R in range(1, max(GRID_ROWS, GRID_COLS))} if np is not None else {}
+
+
+# Optional Numba kernels for the scalar hot loops; None when numba (or
+# NumPy, which it needs for the heatmap) is missing.
+_stamp_jit = None
+_trilat3_jit = None
+if njit is not None and np is not None:
+    @njit(fastmath=True)
+    def _stamp_jit(heatmap, row, col, radius_cells):
+        r2 = radius_cells * radius_cells
+        for r in range(max(row - radius_cells, 0), min(row + radius_cells + 1, heatmap.shape[0])):
+            dy = r - row
+            for c in range(max(col - radius_cells, 0), min(col + radius_cells + 1, heatmap.shape[1])):
+                dx = c - col
+                dd = dx * dx + dy * dy
+                if dd <= r2:
+                    heatmap[r, c] += 1.0 - math.sqrt(dd) / radius_cells
+
+    @njit
+    def _trilat3_jit(x1, y1, d1, x2, y2, d2, x3, y3, d3):
+        # Closed-form 2x2 solve of the three-circle system; returns (ok, x, y)
+        A = 2*(x2 - x1)
+        B = 2*(y2 - y1)
+        C = d1**2 - d2**2 - x1**2 + x2**2 - y1**2 + y2**2
+        D = 2*(x3 - x1)
+        E = 2*(y3 - y1)
+        F = d1**2 - d3**2 - x1**2 + x3**2 - y1**2 + y3**2
+        denom = A*E - B*D
+        if abs(denom) < 1e-6:
+            return False, 0.0, 0.0
+        return True, (C*E - B*F) / denom, (A*F - C*D) / denom
+
+    # Compile now so the first request doesn't pay for it. No on-disk cache:
+    # it records the defining module's name and fails to load when the file
+    # is later run as a script or imported under another name.
+    _stamp_jit(np.zeros((GRID_ROWS, GRID_COLS), dtype=np.float32), 0, 0, 1)
+    _trilat3_jit(0.0, 0.0, 1.0, 1.0, 0.0, 1.0, 0.0, 1.0, 1.0)
+
+
+def new_heatmap():
+    if np is not None:
+        return np.zeros((GRID_ROWS, GRID_COLS), dtype=np.float32)
+    return [[0.0 for _ in range(GRID_COLS)] for _ in range(GRID_ROWS)]
+
+
+def add_influence(heatmap, row: int, col: int, radius_cells: int):
+    """Add a linear falloff of radius_cells around (row, col), clipped to the grid."""
+    if _stamp_jit is not None:
+        _stamp_jit(heatmap, row, col, radius_cells)
+        return
+    if np is not None:
+        # Clip the destination window to the grid and the stamp the same way.
+        top, left = row - radius_cells, col - radius_cells
+        r0, r1 = max(top, 0), min(row + radius_cells + 1, GRID_ROWS)
+        c0, c1 = max(left, 0), min(col + radius_cells + 1, GRID_COLS)
+        stamp = STAMPS.get(radius_cells)
+        if stamp is None:
+            stamp = distance_stamp(radius_cells)
+        heatmap[r0:r1, c0:c1] += stamp[r0 - top:r1 - top, c0 - left:c1 - left]
+        return
+    # Compare squared distances; only cells inside the circle pay for a sqrt.
+    r2 = radius_cells * radius_cells
+    c0, c1 = max(col - radius_cells, 0), min(col + radius_cells + 1, GRID_COLS)
+    for r in range(max(row - radius_cells, 0), min(row + radius_cells + 1, GRID_ROWS)):
+        dy = r - row
+        dy2 = dy * dy
+        heat_row = heatmap[r]
+        for c in range(c0, c1):
+            dx = c - col
+            dd = dx * dx + dy2
+            if dd <= r2:
+                heat_row[c] += 1.0 - math.sqrt(dd) / radius_cells
+
+
+def heatmap_layers(heatmap) -> Tuple[list, list]:
+    """
+    Return (heatmap, deadzone mask) for the JSON response. The heatmap is
+    quantized to 0..HEATMAP_SCALE integers (saturating where APs overlap past
+    1.0); the mask is taken from the unquantized values. Arrays go through
+    encode_json as-is.
+    """
+    if np is not None:
+        quantized = np.clip(heatmap * HEATMAP_SCALE, 0, HEATMAP_SCALE).astype(np.uint8)
+        return quantized, (heatmap <= 0.1).astype(np.uint8)
+    quantized = [[min(HEATMAP_SCALE, max(0, int(cell * HEATMAP_SCALE))) for cell in row] for row in heatmap]
+    return quantized, [[1 if cell <= 0.1 else 0 for cell in row] for row in heatmap]
+
+
+def aggregate_zones(aps: List[dict], snap: ClientSnapshot) -> Tuple[list, Dict[str, Tuple[int, int]]]:
     """
-    Build a heatmap from estimated AP positions (trilaterated), and return
-    node positions for active clients.
+    Build a heatmap from estimated AP positions (compute_ap_positions; empty
+    if not enough clients), and return node positions for active clients.
+    The heatmap is a float32 ndarray when NumPy is available, else a list of
+    lists; see heatmap_layers.
     """
-    heatmap = [[0.0 for _ in range(GRID_COLS)] for _ in range(GRID_ROWS)]
+    heatmap = new_heatmap()
     # Resolve client node positions (only actives, max 3)
     node_positions: Dict[str, Tuple[int, int]] = {}
-    cpos = resolve_client_positions()
+    cpos = resolve_client_positions(snap)
     for cid, (x, y) in cpos.items():
         col, row = point_to_cell(x, y)
         node_positions[cid] = (col, row)
 
-    # Compute AP positions; if not enough clients, return empty heatmap
-    aps, _ = compute_ap_positions()
-
     # Spread influence around each AP position
     for ap in aps:
         ax, ay = ap["x"], ap["y"]
         col, row = point_to_cell(ax, ay)
         est_radius_m = max(2.0, ap.get("distance", 5.0) * 0.6)
         radius_cells = max(1, int(est_radius_m / CELL_SIZE))
-        for r in range(row - radius_cells, row + radius_cells + 1):
-            if r < 0 or r >= GRID_ROWS:
-                continue
-            for c in range(col - radius_cells, col + radius_cells + 1):
-                if c < 0 or c >= GRID_COLS:
-                    continue
-                dist = math.hypot(c - col, r - row)
-                if dist <= radius_cells:
-                    heatmap[r][c] += max(0.0, 1.0 - (dist / radius_cells))
+        add_influence(heatmap, row, col, radius_cells)
 
     return heatmap, node_positions
 
 
+def parse_submission(data) -> Tuple[str, list, Optional[Tuple[float, float]]]:
+    """
+    Validate one scan submission; returns (laptop_id, networks, fixed position or None).
+    Everything the submit handlers do under _lock relies on these checks, so
+    a bad entry is rejected here rather than failing halfway through a store.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Submission must be an object")
+    laptop_id = data.get("laptop_id")
+    networks = data.get("networks")
+    position = data.get("position")  # optional: {x,y} in meters
+    if not laptop_id or networks is None:
+        raise ValueError("Missing laptop_id or networks")
+    if not isinstance(laptop_id, str):
+        raise ValueError("laptop_id must be a string")
+    if not isinstance(networks, list):
+        raise ValueError("networks must be a list")
+    for n in networks:
+        if not isinstance(n, dict):
+            raise ValueError("Each network must be an object")
+        if n.get("bssid") is not None and not isinstance(n["bssid"], str):
+            raise ValueError("bssid must be a string")
+        rssi = n.get("rssi")
+        if rssi is not None and (isinstance(rssi, bool) or not isinstance(rssi, (int, float))):
+            raise ValueError("rssi must be a number")
+    fixed = None
+    if isinstance(position, dict) and "x" in position and "y" in position:
+        try:
+            x = float(position["x"]) ; y = float(position["y"]) 
+            fixed = clamp_to_grid(x, y)
+        except Exception:
+            pass
+    return laptop_id, networks, fixed
+
+
+def _json_default(obj):
+    if np is not None and isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode_json(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_json_default).encode('utf-8')
+
+
+def decode_json(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode('utf-8'))
+
+
 def respond_json(handler: SimpleHTTPRequestHandler, status: int, data):
-    payload = json.dumps(data).encode('utf-8')
+    respond_bytes(handler, status, encode_json(data))
+
+
+def respond_bytes(handler: SimpleHTTPRequestHandler, status: int, payload: bytes):
     handler.send_response(status)
     handler.send_header('Content-Type', 'application/json; charset=utf-8')
     handler.send_header('Content-Length', str(len(payload)))
@@ -244,83 +534,188 @@ def respond_json(handler: SimpleHTTPRequestHandler, status: int, data):
     handler.wfile.write(payload)
 
 
+def coverage_payload(snap: ClientSnapshot) -> bytes:
+    aps, meta = cached("aps", compute_ap_positions, snap)
+    if not meta["enough_clients"]:
+        # Nothing to stamp yet (idle polls before scanners connect): send
+        # empty layers instead of an all-zero grid.
+        return encode_json({
+            "heatmap": [],
+            "heatmap_scale": HEATMAP_SCALE,
+            "deadzones": [],
+            "nodes": {cid: point_to_cell(x, y) for cid, (x, y) in meta["client_positions"].items()},
+            "aps": aps,
+            "meta": meta,
+        })
+    heatmap, node_positions = aggregate_zones(aps, snap)
+    heatmap, deadzone_mask = heatmap_layers(heatmap)
+    return encode_json({
+        "heatmap": heatmap,
+        "heatmap_scale": HEATMAP_SCALE,
+        "deadzones": deadzone_mask,
+        "nodes": node_positions,
+        "aps": aps,
+        "meta": meta,
+    })
+
+
+def ap_positions_payload(snap: ClientSnapshot) -> bytes:
+    aps, meta = cached("aps", compute_ap_positions, snap)
+    return encode_json({
+        "ok": meta.get("enough_clients", False),
+        "aps": aps,
+        "clients": meta.get("client_positions", {}),
+        "active_clients": meta.get("active_clients", []),
+        "grid": {"width": GRID_WIDTH, "height": GRID_HEIGHT}
+    })
+
+
+def distance_strength_payload(snap: ClientSnapshot) -> bytes:
+    """Active clients' networks as distance/strength points, nearest first."""
+    # Flatten all networks into columns
+    rssis: List[float] = []
+    bands: list = []
+    ssids: list = []
+    bssids: list = []
+    for cid in active_clients(snap):
+        for n in snap.scans.get(cid) or []:
+            rssi = n.get('rssi')
+            if rssi is None:
+                continue
+            rssis.append(float(rssi))
+            bands.append(n.get('band'))
+            ssids.append(n.get('ssid'))
+            bssids.append(n.get('bssid'))
+    if np is not None:
+        # Evaluate the path-loss model over the whole array in one pass.
+        dist_arr = 10 ** ((TX_POWER - np.array(rssis, dtype=float)) / (10.0 * PATH_LOSS_EXP))
+        order = np.argsort(dist_arr, kind='stable').tolist()
+        dists = dist_arr.tolist()
+    else:
+        dists = [rssi_to_distance(r) for r in rssis]
+        order = sorted(range(len(dists)), key=dists.__getitem__)
+    points = [{
+        'distance': dists[i],
+        'rssi': rssis[i],
+        'band': bands[i],
+        'ssid': ssids[i],
+        'bssid': bssids[i],
+    } for i in order]
+    return encode_json({"points": points})
+
+
 class AppHandler(SimpleHTTPRequestHandler):
+    # Keep connections open between polls; every response sets Content-Length.
+    protocol_version = 'HTTP/1.1'
+    # Close idle keep-alive connections (closed tabs, scanners that dropped
+    # off Wi-Fi) instead of parking a worker thread on them forever.
+    timeout = 30
+
     def translate_path(self, path: str) -> str:
         path = path.split('?', 1)[0].split('#', 1)[0]
         rel = path.lstrip('/') or 'index.html'
         return os.path.join(WEB_DIR, *rel.split('/'))
 
+    # Exact API path (query string stripped) -> (cache name, payload builder)
+    GET_ROUTES = {
+        "/api/coverage": ("coverage", coverage_payload),
+        "/api/ap_positions": ("ap_positions", ap_positions_payload),
+        "/api/all_distance_strength": ("distance_strength", distance_strength_payload),
+    }
+
     def do_GET(self):
-        if self.path.startswith("/api/coverage"):
-            aps, meta = compute_ap_positions()
-            heatmap, node_positions = aggregate_zones()
-            deadzone_mask = [[1 if cell <= 0.1 else 0 for cell in row] for row in heatmap]
-            respond_json(self, 200, {
-                "heatmap": heatmap,
-                "deadzones": deadzone_mask,
-                "nodes": node_positions,
-                "aps": aps,
-                "meta": meta,
-            })
-            return
-        if self.path.startswith("/api/ap_positions"):
-            aps, meta = compute_ap_positions()
-            respond_json(self, 200, {
-                "ok": meta.get("enough_clients", False),
-                "aps": aps,
-                "clients": meta.get("client_positions", {}),
-                "active_clients": meta.get("active_clients", []),
-                "grid": {"width": GRID_WIDTH, "height": GRID_HEIGHT}
-            })
-            return
-        if self.path.startswith("/api/all_distance_strength"):
-            # Flatten all networks
-            points = []
-            for nets in client_scan_data.values():
-                for n in nets or []:
-                    rssi = n.get('rssi')
-                    if rssi is None:
-                        continue
-                    band = n.get('band')
-                    dist = rssi_to_distance(float(rssi))
-                    points.append({
-                        'distance': dist,
-                        'rssi': float(rssi),
-                        'band': band,
-                        'ssid': n.get('ssid'),
-                        'bssid': n.get('bssid'),
-                    })
-            points.sort(key=lambda p: p['distance'])
-            respond_json(self, 200, {"points": points})
+        route = self.GET_ROUTES.get(self.path.split('?', 1)[0])
+        if route is not None:
+            respond_bytes(self, 200, cached(*route))
             return
         return super().do_GET()
 
-    def do_POST(self):
-        if self.path.startswith("/api/submit_scan"):
-            length = int(self.headers.get('Content-Length', '0'))
-            raw = self.rfile.read(length)
+    def submit_scan_batch(self, data):
+        if not isinstance(data, dict):
+            respond_json(self, 400, {"error": "Batch must be an object"})
+            return
+        submissions = data.get("submissions")
+        if not isinstance(submissions, list):
+            respond_json(self, 400, {"error": "Missing submissions"})
+            return
+        accepted = []
+        errors = []
+        for i, entry in enumerate(submissions):
             try:
-                data = json.loads(raw.decode('utf-8'))
-                laptop_id = data.get("laptop_id")
-                networks = data.get("networks")
-                position = data.get("position")  # optional: {x,y} in meters
-                if laptop_id and networks is not None:
-                    # Store networks and update heartbeat
+                accepted.append(parse_submission(entry))
+            except ValueError as e:
+                errors.append({"index": i, "error": str(e)})
+        if accepted:
+            # One lock acquisition and one invalidation for the batch
+            now = time.time()
+            with _lock:
+                for laptop_id, networks, fixed in accepted:
+                    smooth_rssi(laptop_id, networks)
                     client_scan_data[laptop_id] = networks
-                    client_last_seen[laptop_id] = time.time()
-                    if isinstance(position, dict) and "x" in position and "y" in position:
-                        try:
-                            x = float(position["x"]) ; y = float(position["y"]) 
-                            client_fixed_positions[laptop_id] = clamp_to_grid(x, y)
-                        except Exception:
-                            pass
-                    print(f"Received {len(networks)} networks from {laptop_id}")
-                    respond_json(self, 200, {"status": "success"})
-                else:
-                    respond_json(self, 400, {"error": "Missing laptop_id or networks"})
-            except Exception as e:
-                respond_json(self, 400, {"error": str(e)})
+                    client_last_seen[laptop_id] = now
+                    if fixed is not None:
+                        client_fixed_positions[laptop_id] = fixed
+                drop_stale_clients(now)
+                note_scan_submitted()
+            print(f"Received batch of {len(accepted)} scans")
+        respond_json(self, 200, {"accepted": len(accepted), "errors": errors})
+
+    def submit_scan(self, data):
+        try:
+            laptop_id, networks, fixed = parse_submission(data)
+        except ValueError as e:
+            respond_json(self, 400, {"error": str(e)})
+            return
+        # Store networks and update heartbeat
+        now = time.time()
+        with _lock:
+            smooth_rssi(laptop_id, networks)
+            client_scan_data[laptop_id] = networks
+            client_last_seen[laptop_id] = now
+            if fixed is not None:
+                client_fixed_positions[laptop_id] = fixed
+            drop_stale_clients(now)
+            note_scan_submitted()
+        print(f"Received {len(networks)} networks from {laptop_id}")
+        respond_json(self, 200, {"status": "success"})
+
+    # Exact API path (query string stripped) -> handler taking the decoded body
+    POST_ROUTES = {
+        "/api/submit_scan": submit_scan,
+        "/api/submit_scan_batch": submit_scan_batch,
+    }
+
+    def read_body(self) -> Optional[bytes]:
+        """
+        Read the request body. Returns None, and drops the connection after
+        the response, when Content-Length is unusable: whatever follows
+        can't be told apart from the next keep-alive request.
+        """
+        try:
+            length = int(self.headers.get('Content-Length', '0'))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            return None
+        return self.rfile.read(length)
+
+    def do_POST(self):
+        # Always consume the body, even for a 404, so it isn't parsed as
+        # the start of the next request on this connection.
+        raw = self.read_body()
+        handler = self.POST_ROUTES.get(self.path.split('?', 1)[0])
+        if handler is None:
+            # Unknown; always answer so keep-alive clients aren't left waiting
+            respond_json(self, 404, {"error": "Not found"})
+            return
+        if raw is None:
+            respond_json(self, 400, {"error": "Invalid Content-Length"})
             return
+        try:
+            handler(self, decode_json(raw))
+        except Exception as e:
+            respond_json(self, 400, {"error": str(e)})
 
 
 if __name__ == "__main__":
@@ -328,7 +723,7 @@ if __name__ == "__main__":
     os.makedirs(DATA_DIR, exist_ok=True)
 
     server_address = ('0.0.0.0', 8000)
-    httpd = HTTPServer(server_address, AppHandler)
+    httpd = ThreadingHTTPServer(server_address, AppHandler)
     print("WiFi Coverage Server running on port 8000")
     print(f"Serving static files from {WEB_DIR}")
     httpd.serve_forever()
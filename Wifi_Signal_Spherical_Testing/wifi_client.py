@@ -10,16 +10,24 @@ import json
 import socket
 import time
 import requests
+from requests.adapters import HTTPAdapter
 import pywifi
 
 # --- CONFIGURATION ---
 # IMPORTANT: Change this to the IP address of your main server laptop.
 # Example: SERVER_URL = "http://192.168.1.10:8000/api/submit_scan"
 SERVER_URL = "http://10.213.9.152:8000/api/submit_scan" 
+# Batch endpoint on sphere_server_v1: several laptops' scans in one request.
+BATCH_URL = SERVER_URL + "_batch"
 
 # A unique ID for this laptop. The computer's hostname is a good default.
 LAPTOP_ID = socket.gethostname()
 
+# One long-lived session so every scan round reuses the same keep-alive
+# connection instead of opening a new one per POST.
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
 # --- pywifi Real-time Scanning ---
 try:
     wifi = pywifi.PyWiFi()
@@ -36,84 +44,110 @@ def rssi_to_distance(rssi, tx_power=-42, n=2.7):
     except Exception:
         return None
 
-async def scan_and_send():
-    """Continuously scans for networks and sends them to the server."""
-    if not iface:
-        print("No WiFi interface found. Exiting.")
-        return
+def post_batch(payloads, timeout=5):
+    """
+    Send several {laptop_id, networks, position} payloads in one request.
+    Returns the server's {"accepted": n, "errors": [...]} reply.
+    """
+    response = SESSION.post(BATCH_URL, json={"submissions": list(payloads)}, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+def parse_scan_results(results):
+    """Turn pywifi scan results into the network dicts the server expects."""
+    networks = []
+    seen_bssid = set()
+    for net in results:
+        # --- START OF NEW ERROR HANDLING BLOCK ---
+        try:
+            bssid = getattr(net, 'bssid', '')
+            if not bssid or bssid in seen_bssid:
+                continue
+            seen_bssid.add(bssid)
+
+            rssi = getattr(net, 'signal', None)
+            dist = rssi_to_distance(rssi)
 
+            auth_str = 'Unknown'
+            if hasattr(net, 'akm') and isinstance(net.akm, list):
+                auth_parts = []
+                for a in net.akm:
+                    auth_parts.append(a.name if hasattr(a, 'name') else str(a))
+                auth_str = "/".join(auth_parts)
+
+            encr_str = 'Unknown'
+            if hasattr(net, 'cipher') and hasattr(net.cipher, 'name'):
+                encr_str = net.cipher.name
+            elif hasattr(net, 'cipher'):
+                encr_str = str(net.cipher)
+            
+            networks.append({
+                'ssid': getattr(net, 'ssid', ''),
+                'bssid': bssid,
+                'rssi': rssi,
+                'signal_percent': max(0, min(100, 2 * (rssi + 100))) if rssi else 0,
+                'distance': round(dist, 2) if dist is not None else None,
+                'band': "5 GHz" if hasattr(net, 'freq') and net.freq > 5000 else "2.4 GHz",
+                'channel': net.channel if hasattr(net, 'channel') else None,
+                'auth': auth_str,
+                'encryption': encr_str,
+                'wifi_standard': 'WiFi 4/5/6' # Heuristic
+            })
+        except Exception as e:
+            # If one network profile fails to parse, print a warning and continue
+            print(f"  [!] Warning: Could not parse a network profile. Error: {e}. Skipping it.")
+            continue
+        # --- END OF NEW ERROR HANDLING BLOCK ---
+    return networks
+
+async def scan_producer(queue):
+    """Scan continuously, handing each round's networks to the sender."""
     while True:
         print("Starting new scan...")
-        networks = []
         try:
-            iface.scan()
+            # pywifi calls block, so keep them off the event loop
+            await asyncio.to_thread(iface.scan)
             await asyncio.sleep(2.5) # Give it time to complete
-            results = iface.scan_results()
-            
-            seen_bssid = set()
-            for net in results:
-                # --- START OF NEW ERROR HANDLING BLOCK ---
-                try:
-                    bssid = getattr(net, 'bssid', '')
-                    if not bssid or bssid in seen_bssid:
-                        continue
-                    seen_bssid.add(bssid)
-
-                    rssi = getattr(net, 'signal', None)
-                    dist = rssi_to_distance(rssi)
-
-                    auth_str = 'Unknown'
-                    if hasattr(net, 'akm') and isinstance(net.akm, list):
-                        auth_parts = []
-                        for a in net.akm:
-                            auth_parts.append(a.name if hasattr(a, 'name') else str(a))
-                        auth_str = "/".join(auth_parts)
-
-                    encr_str = 'Unknown'
-                    if hasattr(net, 'cipher') and hasattr(net.cipher, 'name'):
-                        encr_str = net.cipher.name
-                    elif hasattr(net, 'cipher'):
-                        encr_str = str(net.cipher)
-                    
-                    networks.append({
-                        'ssid': getattr(net, 'ssid', ''),
-                        'bssid': bssid,
-                        'rssi': rssi,
-                        'signal_percent': max(0, min(100, 2 * (rssi + 100))) if rssi else 0,
-                        'distance': round(dist, 2) if dist is not None else None,
-                        'band': "5 GHz" if hasattr(net, 'freq') and net.freq > 5000 else "2.4 GHz",
-                        'channel': net.channel if hasattr(net, 'channel') else None,
-                        'auth': auth_str,
-                        'encryption': encr_str,
-                        'wifi_standard': 'WiFi 4/5/6' # Heuristic
-                    })
-                except Exception as e:
-                    # If one network profile fails to parse, print a warning and continue
-                    print(f"  [!] Warning: Could not parse a network profile. Error: {e}. Skipping it.")
-                    continue
-                # --- END OF NEW ERROR HANDLING BLOCK ---
-            
+            results = await asyncio.to_thread(iface.scan_results)
+            networks = parse_scan_results(results)
             print(f" - Found {len(networks)} unique networks.")
-
-            # Send the data to the server
-            payload = {
-                "laptop_id": LAPTOP_ID,
-                "networks": networks
-            }
-            try:
-                response = requests.post(SERVER_URL, json=payload, timeout=5)
-                if response.status_code == 200:
-                    print(" - Successfully sent data to server.")
-                else:
-                    print(f" - ERROR: Server responded with status {response.status_code}: {response.text}")
-            except requests.exceptions.RequestException as e:
-                print(f" - ERROR: Could not send data to server: {e}")
-
+            # Blocks while the previous round is still being sent
+            await queue.put(networks)
         except Exception as e:
             print(f"An error occurred during the scan loop: {e}")
-        
-        # Wait before the next scan cycle
-        await asyncio.sleep(2)
+            await asyncio.sleep(2)
+
+async def send_consumer(queue):
+    """POST each scan to the server while the next scan is in progress."""
+    while True:
+        networks = await queue.get()
+        # Send the data to the server
+        payload = {
+            "laptop_id": LAPTOP_ID,
+            "networks": networks
+        }
+        try:
+            response = await asyncio.to_thread(SESSION.post, SERVER_URL, json=payload, timeout=5)
+            if response.status_code == 200:
+                print(" - Successfully sent data to server.")
+            else:
+                print(f" - ERROR: Server responded with status {response.status_code}: {response.text}")
+        except requests.exceptions.RequestException as e:
+            print(f" - ERROR: Could not send data to server: {e}")
+        except Exception as e:
+            # Keep consuming; one bad round mustn't stop the scanner
+            print(f"An error occurred while sending scan data: {e}")
+
+async def scan_and_send():
+    """Continuously scans for networks and sends them to the server."""
+    if not iface:
+        print("No WiFi interface found. Exiting.")
+        return
+
+    # The NIC's scan dwell and the HTTP round-trip overlap; maxsize=1 keeps
+    # at most one finished scan waiting so data never goes stale.
+    queue = asyncio.Queue(maxsize=1)
+    await asyncio.gather(scan_producer(queue), send_consumer(queue))
 
 if __name__ == "__main__":
     print(f"--- WiFi Scanning Client ---")